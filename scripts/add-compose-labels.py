@@ -9,6 +9,9 @@ import sys
 
 COMPOSE_FILE = "docker-compose.hub.yml"
 
+TOP_LEVEL_KEY = re.compile(r'^([A-Za-z_][\w-]*):')
+SERVICE_LINE = re.compile(r'^  ([a-z-]+):$')
+
 # Service classifications from Phase 0 Audit
 SERVICE_METADATA = {
     "postgres": {
@@ -64,55 +67,42 @@ def add_labels_to_compose():
         lines = f.readlines()
     
     output = []
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        output.append(line)
+    in_services = False
+    pending = None  # Service still waiting for its labels anchor line
+    
+    for line in lines:
+        # Only keys directly under the top-level services: mapping are services
+        top_level = TOP_LEVEL_KEY.match(line)
+        if top_level:
+            in_services = top_level.group(1) == 'services'
+            pending = None
+            output.append(line)
+            continue
         
         # Check if this is a service definition line
-        match = re.match(r'^  ([a-z-]+):$', line)
+        match = SERVICE_LINE.match(line) if in_services else None
         if match:
             service_name = match.group(1)
-            
             # Skip if not in our metadata or if it's a network
-            if service_name not in SERVICE_METADATA:
-                i += 1
-                continue
-            
-            metadata = SERVICE_METADATA[service_name]
-            
-            # Look ahead to find where to insert labels
-            # Labels should go after image/platform but before env_file/restart
-            j = i + 1
-            insert_pos = None
-            
-            # Find the right place to insert (after image/container_name/platform, before restart/env_file)
-            while j < len(lines) and lines[j].startswith('    '):
-                if lines[j].strip().startswith('restart:') or lines[j].strip().startswith('env_file:'):
-                    insert_pos = j
-                    break
-                j += 1
-            
-            if insert_pos:
-                # Check if labels already exist
-                labels_exist = False
-                for check_line in lines[i:insert_pos]:
-                    if 'dive.service.class' in check_line:
-                        labels_exist = True
-                        break
-                
-                if not labels_exist:
-                    # Insert labels
-                    labels_block = f'    labels:\n'
-                    labels_block += f'      dive.service.class: "{metadata["class"]}"\n'
-                    labels_block += f'      dive.service.description: "{metadata["desc"]}"\n'
-                    
-                    output.insert(len(output) - (i - insert_pos) + i, labels_block)
-                    print(f"✅ Added labels to {service_name} (class: {metadata['class']})")
-                else:
-                    print(f"⏭️  Skipped {service_name} (labels already exist)")
+            pending = service_name if service_name in SERVICE_METADATA else None
+        elif pending:
+            stripped = line.strip()
+            if not line.startswith('    '):
+                # Left the service block without finding restart/env_file
+                pending = None
+            elif 'dive.service.class' in line:
+                print(f"⏭️  Skipped {pending} (labels already exist)")
+                pending = None
+            elif stripped.startswith('restart:') or stripped.startswith('env_file:'):
+                # Labels go after image/container_name/platform, before restart/env_file
+                metadata = SERVICE_METADATA[pending]
+                output.append('    labels:\n')
+                output.append(f'      dive.service.class: "{metadata["class"]}"\n')
+                output.append(f'      dive.service.description: "{metadata["desc"]}"\n')
+                print(f"✅ Added labels to {pending} (class: {metadata['class']})")
+                pending = None
         
-        i += 1
+        output.append(line)
     
     # Write output
     with open(COMPOSE_FILE + '.new', 'w') as f:
@@ -5,24 +5,53 @@ Match the exact pattern of the old Breadcrumbs component
 """
 
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 FRONTEND_DIR = Path("frontend/src/app/admin")
 
-def fix_breadcrumbs_placement(filepath: Path) -> bool:
+# <div className="mb-6"><InteractiveBreadcrumbs /></div>
+BREADCRUMBS_DIV_RE = re.compile(r'<div className="mb-6">\s*<InteractiveBreadcrumbs />\s*</div>')
+# {/* comment */} <InteractiveBreadcrumbs /> right inside a PageLayout opening tag
+BREADCRUMBS_CHILD_RE = re.compile(
+    r'\s*'
+    r'(?:\{/\*[^*]*\*/\}\s*)?'
+    r'<InteractiveBreadcrumbs />\s*'
+)
+
+
+def iter_pagelayout_open_tags(content: str):
+    """Yield (start, end) offsets of each <PageLayout ...> opening tag.
+
+    Walks to the closing '>' while tracking {...} depth, so multi-line props
+    such as onBack={() => router.back()} don't end the tag early.
+    """
+    idx = content.find('<PageLayout')
+    while idx != -1:
+        i = idx + len('<PageLayout')
+        if i < len(content) and content[i].isspace():
+            depth = 0
+            while i < len(content):
+                char = content[i]
+                if char == '{':
+                    depth += 1
+                elif char == '}':
+                    depth -= 1
+                elif char == '>' and depth == 0:
+                    yield idx, i + 1
+                    break
+                i += 1
+        idx = content.find('<PageLayout', i)
+
+def fix_breadcrumbs_placement(filepath: Path, content: str) -> bool:
     """Move InteractiveBreadcrumbs outside of PageLayout children"""
 
-    if not filepath.exists():
-        return False
-
-    content = filepath.read_text()
     original_content = content
 
     # Pattern 1: Remove the div wrapper around InteractiveBreadcrumbs
     # From: <div className="mb-6"><InteractiveBreadcrumbs /></div>
     # To: <InteractiveBreadcrumbs />
-    pattern1 = r'<div className="mb-6">\s*<InteractiveBreadcrumbs />\s*</div>'
-    content = re.sub(pattern1, '<InteractiveBreadcrumbs />', content)
+    content = BREADCRUMBS_DIV_RE.sub('<InteractiveBreadcrumbs />', content)
 
     # Pattern 2: Move InteractiveBreadcrumbs before closing PageLayout tag
     # Look for: <PageLayout ...>
@@ -31,31 +60,17 @@ def fix_breadcrumbs_placement(filepath: Path) -> bool:
     #           <actual content>
     #         </PageLayout>
 
-    # Find PageLayout opening and extract props
-    pagelayout_match = re.search(
-        r'(<PageLayout\s+[^>]*>)\s*'
-        r'(\{/\*[^*]*\*/\}\s*)?'
-        r'<InteractiveBreadcrumbs />\s*',
-        content
-    )
-
-    if pagelayout_match:
-        # Remove InteractiveBreadcrumbs from inside PageLayout
-        content = re.sub(
-            r'(<PageLayout\s+[^>]*>)\s*'
-            r'(\{/\*[^*]*\*/\}\s*)?'
-            r'<InteractiveBreadcrumbs />\s*',
-            r'\1\n      ',
-            content
-        )
-
-        # Add InteractiveBreadcrumbs right after PageLayout closing >
-        content = re.sub(
-            r'(<PageLayout\s+[^>]*>)\n',
-            r'\1\n      <InteractiveBreadcrumbs />\n',
-            content,
-            count=1
-        )
+    parts = []
+    pos = 0
+    for _, tag_end in iter_pagelayout_open_tags(content):
+        match = BREADCRUMBS_CHILD_RE.match(content, tag_end)
+        if match:
+            # Put InteractiveBreadcrumbs right after PageLayout closing >
+            parts.append(content[pos:tag_end])
+            parts.append('\n      <InteractiveBreadcrumbs />\n      ')
+            pos = match.end()
+    parts.append(content[pos:])
+    content = ''.join(parts)
 
     if content != original_content:
         filepath.write_text(content)
@@ -63,18 +78,27 @@ def fix_breadcrumbs_placement(filepath: Path) -> bool:
     return False
 
 
+def process_page(page: Path) -> bool:
+    """Read an admin page and fix it if it renders InteractiveBreadcrumbs"""
+    content = page.read_text()
+    if "InteractiveBreadcrumbs" not in content:
+        return False
+    return fix_breadcrumbs_placement(page, content)
+
+
 def main():
     print("🔄 Fixing InteractiveBreadcrumbs Placement")
     print("=" * 60)
     print()
 
     # Find all page.tsx files
-    admin_pages = list(FRONTEND_DIR.rglob("page.tsx"))
+    admin_pages = FRONTEND_DIR.rglob("page.tsx")
 
     fixed = 0
-    for page in admin_pages:
-        if "InteractiveBreadcrumbs" in page.read_text():
-            if fix_breadcrumbs_placement(page):
+    with ThreadPoolExecutor() as executor:
+        # The page generator is consumed once, so each result carries its page
+        for page, was_fixed in executor.map(lambda page: (page, process_page(page)), admin_pages):
+            if was_fixed:
                 print(f"✓ Fixed: {page.relative_to(FRONTEND_DIR.parent.parent.parent)}")
                 fixed += 1
 
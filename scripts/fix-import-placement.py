@@ -7,28 +7,30 @@ Removes duplicate/misplaced imports added after dynamic imports
 import re
 from pathlib import Path
 
+# getBackendUrl import left directly after a dynamic import
+MISPLACED_IMPORT_RE = re.compile(
+    r"(await import\(['\"].*?['\"]\);)\s*\nimport { getBackendUrl } from '@/lib/api-utils';"
+)
+STRAY_IMPORT_RE = re.compile(r"\nimport { getBackendUrl } from '@/lib/api-utils';(?=\s*\n\s*const)")
+STATIC_IMPORT_RE = re.compile(r"(import[^;]+;)(?=\n\n|\nconst|\nexport)")
+
 def fix_import_placement(filepath):
     """Fix imports that were added in wrong locations"""
     with open(filepath, 'r') as f:
         content = f.read()
     
-    # Check if file has the misplaced import issue
-    pattern = r"(await import\(['\"].*?['\"]\);)\s*\nimport { getBackendUrl } from '@/lib/api-utils';"
-    
-    if not re.search(pattern, content):
+    # Check if file has the misplaced import issue (cheap substring test first)
+    if "await import(" not in content or "@/lib/api-utils" not in content:
+        return False
+    if not MISPLACED_IMPORT_RE.search(content):
         return False
     
     # Remove all misplaced imports after dynamic imports
-    content = re.sub(
-        r"\nimport { getBackendUrl } from '@/lib/api-utils';(?=\s*\n\s*const)",
-        "",
-        content
-    )
+    content = STRAY_IMPORT_RE.sub("", content)
     
     # Ensure the import is at the top (after other imports)
     # Find the last static import
-    import_pattern = r"(import[^;]+;)(?=\n\n|\nconst|\nexport)"
-    matches = list(re.finditer(import_pattern, content))
+    matches = list(STATIC_IMPORT_RE.finditer(content))
     
     # Check if getBackendUrl import already exists at top
     if "import { getBackendUrl } from '@/lib/api-utils';" not in content[:500]:
@@ -8,30 +8,43 @@ Git from constantly detecting files as "modified".
 
 import sys
 import os
-import glob
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes read per step when scanning backwards from the end of a file
+TAIL_BLOCK_SIZE = 4096
 
 def fix_file(file_path):
     """Remove trailing empty lines from a file while preserving content."""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-
-        if not lines:
-            return False  # Empty file, nothing to fix
-
-        # Remove trailing empty lines
-        original_length = len(lines)
-        while lines and lines[-1].strip() == '':
-            lines.pop()
-
-        # Ensure file ends with exactly one newline if it had content
-        if lines and not lines[-1].endswith('\n'):
-            lines[-1] += '\n'
-
-        # Only write back if we actually changed something
-        if len(lines) != original_length:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
+        with open(file_path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return False  # Empty file, nothing to fix
+
+            # Only read the tail, extending backwards until real content shows up
+            offset = size
+            tail = b''
+            while offset > 0:
+                step = min(offset, TAIL_BLOCK_SIZE)
+                offset -= step
+                f.seek(offset)
+                tail = f.read(step) + tail
+                if tail.rstrip():
+                    break
+
+        content = tail.rstrip()
+        if content:
+            # Keep the last content line through its newline, drop what follows
+            newline = tail.find(b'\n', len(content))
+            if newline == -1:
+                return False  # Last line has no newline, nothing trails it
+            new_size = offset + newline + 1
+        else:
+            new_size = 0  # Whitespace only
+
+        # Only touch the file if we actually changed something
+        if new_size != size:
+            os.truncate(file_path, new_size)
             return True
 
     except Exception as e:
@@ -45,30 +58,35 @@ def main():
     print("DIVE V3 - Fixing trailing newlines...")
     print("=" * 50)
 
-    # File patterns to process
-    patterns = [
-        "**/*.yml", "**/*.yaml", "**/*.md", "**/*.ts", "**/*.tsx",
-        "**/*.js", "**/*.jsx", "**/*.json", "**/*.css", "**/*.scss",
-        "**/*.html", "**/*.sh", "**/*.py", "**/*.java", "**/*.xml",
-        "**/*.properties", "**/*.rego", "**/*.ftl"
-    ]
+    # File extensions to process
+    extensions = {
+        ".yml", ".yaml", ".md", ".ts", ".tsx",
+        ".js", ".jsx", ".json", ".css", ".scss",
+        ".html", ".sh", ".py", ".java", ".xml",
+        ".properties", ".rego", ".ftl"
+    }
 
     # Directories to exclude
     exclude_dirs = {".git", "node_modules", ".next", "dist", "build"}
 
-    fixed_count = 0
-    processed_count = 0
+    # Single walk of the tree; prune excluded and hidden directories in place
+    file_paths = []
+    for root, dirs, files in os.walk(os.curdir):
+        dirs[:] = [d for d in dirs if d not in exclude_dirs and not d.startswith('.')]
 
-    for pattern in patterns:
-        for file_path in glob.glob(pattern, recursive=True):
-            # Skip excluded directories
-            parts = file_path.split(os.sep)
-            if any(part in exclude_dirs for part in parts):
+        for name in files:
+            if name.startswith('.') or os.path.splitext(name)[1] not in extensions:
                 continue
 
-            processed_count += 1
+            file_paths.append(os.path.normpath(os.path.join(root, name)))
+
+    fixed_count = 0
+    processed_count = len(file_paths)
 
-            if fix_file(file_path):
+    # Files are independent and the work is mostly small reads, so overlap them
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        for file_path, fixed in zip(file_paths, executor.map(fix_file, file_paths)):
+            if fixed:
                 print(f"✓ Fixed: {file_path}")
                 fixed_count += 1
 
@@ -7,6 +7,13 @@ import os
 import re
 from pathlib import Path
 
+# Hardcoded backend URL declarations that need migration (one alternative per variable name)
+BACKEND_URL_DECL_RE = re.compile(
+    r"const (BACKEND_URL) = process\.env\.BACKEND_URL \|\| process\.env\.NEXT_PUBLIC[^;]+;"
+    r"|const (backendUrl)\s*=\s*process\.env\.(?:BACKEND_URL|NEXT_PUBLIC_BACKEND_URL|NEXT_PUBLIC_API_URL)(?:\s*\|\|[^;]+)?;"
+)
+IMPORT_RE = re.compile(r"(import[^;]+;)")
+
 def migrate_file(filepath):
     """Migrate a single file to use dynamic configuration"""
     with open(filepath, 'r') as f:
@@ -16,25 +23,21 @@ def migrate_file(filepath):
     if "from '@/lib/api-utils'" in content or 'from "@/lib/api-utils"' in content:
         return False
     
-    # Check if file needs migration (multiple patterns)
-    patterns = [
-        r"const BACKEND_URL = process\.env\.BACKEND_URL \|\| process\.env\.NEXT_PUBLIC[^;]+;",
-        r"const backendUrl\s*=\s*process\.env\.(BACKEND_URL|NEXT_PUBLIC[^;]+);",
-        r"const backendUrl\s*=\s*process\.env\.BACKEND_URL\s*\|\|[^;]+;",
-    ]
+    # Every declaration we rewrite reads one of these env vars
+    if "process.env.BACKEND_URL" not in content and "process.env.NEXT_PUBLIC" not in content:
+        return False
     
-    needs_migration = False
-    for pattern in patterns:
-        if re.search(pattern, content):
-            needs_migration = True
-            break
+    # Replace all hardcoded declarations in a single pass
+    content, replaced = BACKEND_URL_DECL_RE.subn(
+        lambda m: f"const {m.group(1) or m.group(2)} = getBackendUrl();",
+        content
+    )
     
-    if not needs_migration:
+    if not replaced:
         return False
     
     # Find the last import statement
-    import_pattern = r"(import[^;]+;)"
-    imports = list(re.finditer(import_pattern, content))
+    imports = list(IMPORT_RE.finditer(content))
     
     if not imports:
         print(f"  ⚠️  No imports found in {filepath}")
@@ -47,23 +50,6 @@ def migrate_file(filepath):
     new_import = "\nimport { getBackendUrl } from '@/lib/api-utils';"
     content = content[:insert_pos] + new_import + content[insert_pos:]
     
-    # Replace all patterns
-    content = re.sub(
-        r"const BACKEND_URL = process\.env\.BACKEND_URL \|\| process\.env\.NEXT_PUBLIC[^;]+;",
-        "const BACKEND_URL = getBackendUrl();",
-        content
-    )
-    content = re.sub(
-        r"const backendUrl\s*=\s*process\.env\.(BACKEND_URL|NEXT_PUBLIC_BACKEND_URL|NEXT_PUBLIC_API_URL)(\s*\|\|[^;]+)?;",
-        "const backendUrl = getBackendUrl();",
-        content
-    )
-    content = re.sub(
-        r"const backendUrl\s*=\s*process\.env\.BACKEND_URL\s*\|\|[^;]+;",
-        "const backendUrl = getBackendUrl();",
-        content
-    )
-    
     # Write back
     with open(filepath, 'w') as f:
         f.write(content)
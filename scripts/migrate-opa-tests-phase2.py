@@ -7,8 +7,12 @@ Version: 2.0.0
 Date: 2026-01-30
 """
 
+import io
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 from typing import List, Tuple, Dict
 
@@ -19,49 +23,47 @@ class Colors:
     RED = '\033[0;31m'
     NC = '\033[0m'
 
-def log_info(msg: str):
-    print(f"{Colors.BLUE}[INFO]{Colors.NC} {msg}")
-
-def log_success(msg: str):
-    print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} {msg}")
-
-def log_error(msg: str):
-    print(f"{Colors.RED}[ERROR]{Colors.NC} {msg}")
-
-def fix_aal_tests(content: str) -> Tuple[str, int]:
-    """Fix AAL enforcement tests - add mock data to all authorization.decision calls."""
-    changes = 0
-
-    # Pattern: Find authorization.decision calls without mock data
-    pattern = r'(result\s*:=\s*authorization\.decision\s+with\s+input\s+as\s+\{[^}]+\}[^}]*\})\s*(\n\s*)(result\.allow)'
-
-    def add_mocks(match):
-        nonlocal changes
-        test_call = match.group(1)
-        whitespace = match.group(2)
-        assertion = match.group(3)
-
-        # Check if already has mocks
-        if "with data.dive.tenant" in test_call:
-            return match.group(0)
-
-        changes += 1
-        mocks = f"\n    with data.dive.tenant.base.trusted_issuers as {{}}"
-        mocks += f"\n    with data.dive.tenant.federation_constraints.federation_matrix as {{}}"
-
-        return test_call + mocks + whitespace + assertion
-
-    modified = re.sub(pattern, add_mocks, content, flags=re.DOTALL)
-    return modified, changes
-
-def fix_tenant_base_tests(content: str) -> Tuple[str, int]:
-    """Fix tenant base tests - these need actual tenant configuration data."""
-    changes = 0
-
-    # These tests expect real tenant data, not empty mocks
-    # We need to provide mock tenant configurations
-
-    tenant_config_mock = """{
+# Plain output when piped to a file or CI log, or when NO_COLOR is set
+if not sys.stdout.isatty() or os.environ.get("NO_COLOR"):
+    Colors.BLUE = Colors.GREEN = Colors.YELLOW = Colors.RED = Colors.NC = ''
+
+# Log line prefixes, built once the colors are settled
+INFO_PREFIX = f"{Colors.BLUE}[INFO]{Colors.NC} "
+SUCCESS_PREFIX = f"{Colors.GREEN}[SUCCESS]{Colors.NC} "
+ERROR_PREFIX = f"{Colors.RED}[ERROR]{Colors.NC} "
+
+def _atomic(name: str, pattern: str) -> str:
+    """Match pattern as an atomic group: capture it in a lookahead, then consume the capture."""
+    return f'(?=(?P<{name}>{pattern}))(?P={name})'
+
+# Any character except '}' that does not start a tenant mock ("with data.dive.tenant")
+_NO_TENANT_MOCK = r'(?:[^}w]|w(?!ith data\.dive\.tenant))'
+# Whitespace up to the last line break, then that break plus the next line's indentation
+_LINE_GAP = r'(?=(?P<lead>\s*)\n)(?P=lead)(?P<gap>\n[^\S\n]*)'
+# authorization.decision call without mock data, followed by its result.allow assertion
+AAL_DECISION_RE = re.compile(
+    r'(?P<call>result\s*:=\s*authorization\.decision\s+with\s+input\s+as\s+'
+    + _atomic('args', r'\{' + _NO_TENANT_MOCK + r'+\}' + _NO_TENANT_MOCK + r'*\}') + r')'
+    + _LINE_GAP + r'(?P<next>result\.allow)',
+    re.DOTALL
+)
+# authz.allow / authz.decision call followed directly by its result (no mocks yet)
+AUTHZ_CALL_RE = re.compile(
+    r'(?P<call>authz\.(?:allow|decision)\s+with\s+input\s+as\s+'
+    + _atomic('args', r'\{[^}]+\}[^}]*\}') + r')'
+    + _LINE_GAP + r'(?P<next>result)',
+    re.DOTALL
+)
+# Replacement for both patterns: the call, empty tenant mocks, then what followed it
+ADD_TENANT_MOCKS = (
+    r'\g<call>'
+    "\n    with data.dive.tenant.base.trusted_issuers as {}"
+    "\n    with data.dive.tenant.federation_constraints.federation_matrix as {}"
+    r'\g<gap>\g<next>'
+)
+
+# Mock tenant configuration injected into tenant base tests
+TENANT_CONFIG_MOCK = """{
     "USA": {
         "issuer": "https://keycloak.usa.dive.local/realms/dive-v3-broker",
         "enabled": true,
@@ -83,45 +85,53 @@ def fix_tenant_base_tests(content: str) -> Tuple[str, int]:
         "federation_partners": ["USA", "GBR"]
     }
 }"""
+MOCK_TENANT_CONFIG_DEFINITION = f"\n# Mock tenant configuration for testing\nmock_tenant_config := {TENANT_CONFIG_MOCK}\n\n"
+IMPORT_REGO_V1 = "\nimport rego.v1\n"
+
+# Below this many files, worker process startup costs more than it saves
+MIN_FILES_FOR_POOL = 4
+
+def log_info(msg: str):
+    print(INFO_PREFIX + msg)
+
+def log_success(msg: str):
+    print(SUCCESS_PREFIX + msg)
+
+def log_error(msg: str):
+    print(ERROR_PREFIX + msg)
+
+def fix_aal_tests(content: str) -> Tuple[str, int]:
+    """Fix AAL enforcement tests - add mock data to all authorization.decision calls."""
+    if "authorization.decision" not in content:
+        return content, 0
+
+    return AAL_DECISION_RE.subn(ADD_TENANT_MOCKS, content)
+
+def fix_tenant_base_tests(content: str) -> Tuple[str, int]:
+    """Fix tenant base tests - these need actual tenant configuration data."""
+    changes = 0
+
+    # These tests expect real tenant data, not empty mocks
+    # We need to provide mock tenant configurations
 
     # Pattern: Find test functions in tenant.base_test package
     if "package dive.tenant.base_test" in content:
         # Add mock data helper at the top of the file
         if "mock_tenant_config" not in content:
-            insert_pos = content.find("import rego.v1")
-            if insert_pos > 0:
-                end_of_import = content.find("\n", insert_pos) + 1
-                mock_definition = f"\n# Mock tenant configuration for testing\nmock_tenant_config := {tenant_config_mock}\n\n"
-                content = content[:end_of_import] + mock_definition + content[end_of_import:]
+            import_pos = content.find(IMPORT_REGO_V1)
+            if import_pos >= 0:
+                end_of_import = import_pos + len(IMPORT_REGO_V1)
+                content = content[:end_of_import] + MOCK_TENANT_CONFIG_DEFINITION + content[end_of_import:]
                 changes += 1
 
     return content, changes
 
 def fix_observability_tests(content: str) -> Tuple[str, int]:
     """Fix observability tests - ensure all authz.allow calls have mocks."""
-    changes = 0
-
-    # Pattern: authz.allow or authz.decision without mocks
-    pattern = r'(authz\.(?:allow|decision)\s+with\s+input\s+as\s+\{[^}]+\}[^}]*\})\s*(\n\s*)(with data\.dive\.tenant|result)'
-
-    def add_mocks_if_needed(match):
-        nonlocal changes
-        test_call = match.group(1)
-        whitespace = match.group(2)
-        next_part = match.group(3)
+    if "authz.allow" not in content and "authz.decision" not in content:
+        return content, 0
 
-        # Check if mocks already present
-        if next_part.startswith("with data.dive.tenant"):
-            return match.group(0)
-
-        changes += 1
-        mocks = f"\n    with data.dive.tenant.base.trusted_issuers as {{}}"
-        mocks += f"\n    with data.dive.tenant.federation_constraints.federation_matrix as {{}}"
-
-        return test_call + mocks + whitespace + next_part
-
-    modified = re.sub(pattern, add_mocks_if_needed, content, flags=re.DOTALL)
-    return modified, changes
+    return AUTHZ_CALL_RE.subn(ADD_TENANT_MOCKS, content)
 
 def fix_comprehensive_authz_tests(content: str) -> Tuple[str, int]:
     """Fix comprehensive authz tests."""
@@ -138,44 +148,77 @@ def migrate_test_file(file_path: Path) -> bool:
     log_info(f"Migrating: {file_path.name}")
 
     try:
-        content = file_path.read_text()
-        backup_path = file_path.with_suffix('.rego.backup2')
-        backup_path.write_text(content)
-
-        total_changes = 0
-
-        # Apply fixes based on file type
-        if "aal_enforcement_test" in file_path.name:
-            content, changes = fix_aal_tests(content)
-            total_changes += changes
-        elif "base_test" in file_path.name and "tenant" in str(file_path):
-            content, changes = fix_tenant_base_tests(content)
-            total_changes += changes
-        elif "observability" in file_path.name:
-            content, changes = fix_observability_tests(content)
-            total_changes += changes
-        elif "comprehensive_test" in file_path.name:
-            content, changes = fix_comprehensive_authz_tests(content)
-            total_changes += changes
-        else:
-            # Apply general fixes
-            content, changes1 = fix_observability_tests(content)
-            content, changes2 = fix_aal_tests(content)
-            total_changes = changes1 + changes2
-
-        if total_changes == 0:
+        # Empty files have nothing to migrate; skip the read
+        if file_path.stat().st_size == 0:
             log_info(f"  No changes needed")
-            backup_path.unlink()
             return True
+        original = file_path.read_text()
+    except (OSError, UnicodeDecodeError) as e:
+        log_error(f"  Failed: {str(e)}")
+        return False
 
-        file_path.write_text(content)
-        log_success(f"  ✓ {total_changes} changes applied")
+    content = original
+    total_changes = 0
+
+    # Apply fixes based on file type
+    if "aal_enforcement_test" in file_path.name:
+        content, changes = fix_aal_tests(content)
+        total_changes += changes
+    elif "base_test" in file_path.name and "tenant" in str(file_path):
+        content, changes = fix_tenant_base_tests(content)
+        total_changes += changes
+    elif "observability" in file_path.name:
+        content, changes = fix_observability_tests(content)
+        total_changes += changes
+    elif "comprehensive_test" in file_path.name:
+        content, changes = fix_comprehensive_authz_tests(content)
+        total_changes += changes
+    else:
+        # Apply general fixes
+        content, changes1 = fix_observability_tests(content)
+        content, changes2 = fix_aal_tests(content)
+        total_changes = changes1 + changes2
+
+    if total_changes == 0:
+        log_info(f"  No changes needed")
         return True
 
-    except Exception as e:
+    # Back up the original, then swap in the fixed content atomically
+    tmp_path = file_path.with_suffix('.rego.tmp')
+    try:
+        file_path.with_suffix('.rego.backup2').write_text(original)
+        tmp_path.write_text(content)
+        os.replace(tmp_path, file_path)
+    except OSError as e:
         log_error(f"  Failed: {str(e)}")
+        tmp_path.unlink(missing_ok=True)
         return False
 
+    log_success(f"  ✓ {total_changes} changes applied")
+    return True
+
+def migrate_and_capture(file_path: Path) -> Tuple[bool, str]:
+    """Migrate a test file in a worker process, returning its result and printed output."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        migrated = migrate_test_file(file_path)
+    return migrated, output.getvalue()
+
+def migrate_test_files(test_files: List[Path]) -> List[bool]:
+    """
+    Migrate test files, across worker processes when there are enough of them.
+    Per-file output is printed in file order either way.
+    """
+    if len(test_files) < MIN_FILES_FOR_POOL:
+        return [migrate_test_file(test_file) for test_file in test_files]
+
+    results = []
+    with ProcessPoolExecutor() as executor:
+        for migrated, output in executor.map(migrate_and_capture, test_files):
+            print(output, end="")
+            results.append(migrated)
+    return results
+
 def main():
     log_info("Starting Enhanced OPA Test Migration (Phase 2)...")
 
@@ -191,7 +234,7 @@ def main():
         policies_dir / "tenant" / "base_test.rego",
     ]
 
-    success_count = 0
+    existing_files = []
     failed_count = 0
 
     for test_file in failing_files:
@@ -199,11 +242,11 @@ def main():
             log_error(f"File not found: {test_file}")
             failed_count += 1
             continue
+        existing_files.append(test_file)
 
-        if migrate_test_file(test_file):
-            success_count += 1
-        else:
-            failed_count += 1
+    results = migrate_test_files(existing_files)
+    success_count = sum(results)
+    failed_count += len(results) - success_count
 
     print("\n" + "="*60)
     log_success(f"Successfully migrated: {success_count} files")
@@ -7,10 +7,15 @@ Version: 1.0.0
 Date: 2026-01-30
 """
 
+import io
+import os
 import re
 import sys
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 # ANSI color codes
 class Colors:
@@ -20,133 +25,187 @@ class Colors:
     RED = '\033[0;31m'
     NC = '\033[0m'  # No Color
 
+# Plain output when piped to a file or CI log, or when NO_COLOR is set
+if not sys.stdout.isatty() or os.environ.get("NO_COLOR"):
+    Colors.BLUE = Colors.GREEN = Colors.YELLOW = Colors.RED = Colors.NC = ''
+
+# Log line prefixes, built once the colors are settled
+INFO_PREFIX = f"{Colors.BLUE}[INFO]{Colors.NC} "
+SUCCESS_PREFIX = f"{Colors.GREEN}[SUCCESS]{Colors.NC} "
+WARNING_PREFIX = f"{Colors.YELLOW}[WARNING]{Colors.NC} "
+ERROR_PREFIX = f"{Colors.RED}[ERROR]{Colors.NC} "
+
+# Policy calls that receive mock data injections
+MOCKED_CALLS = (
+    "authorization.decision",
+    "authz.allow",
+    "authz.decision",
+    "coi_validation.allow",
+    "guardrails.guardrails_pass",
+)
+
+def _atomic(name: str, pattern: str) -> str:
+    """Match pattern as an atomic group: capture it in a lookahead, then consume the capture."""
+    return f'(?=(?P<{name}>{pattern}))(?P={name})'
+
+# Policy call with input, its existing data mocks, then the result/decision line.
+# A with-line that already mocks trusted_issuers cannot be part of the mocks group,
+# so calls that are already mocked never match. The input object and each with-line
+# are atomic, so a near miss fails without re-splitting them.
+MOCK_INJECTION_RE = re.compile(
+    r'(?P<call>(?:' + '|'.join(re.escape(call) for call in MOCKED_CALLS) + r')\s+with input as '
+    + _atomic('args', r'\{[^}]+\}') + r')'
+    r'(?P<mocks>(?:\s+with (?![^\n]*data\.dive\.tenant\.base\.trusted_issuers)data\.'
+    + _atomic('mock', r'[^\n]+') + r')*)'
+    r'(?=(?P<lead>\s*)\n)(?P=lead)(?P<rest>\n\s*(?:result|decision))',
+    re.DOTALL
+)
+ADD_MOCK_DATA = (
+    r'\g<call>\g<mocks>'
+    "\n    with data.dive.tenant.base.trusted_issuers as {}"
+    "\n    with data.dive.tenant.federation_constraints.federation_matrix as {}"
+    r'\g<rest>'
+)
+_ACTION_ALTERNATIVES = (
+    # "action": "read"
+    r'(?P<action>"action":\s*"(?P<action_type>\w+)")'
+    # "action": {"operation": "read"}
+    r'|(?P<operation>"action":\s*\{\s*"operation":\s*"(?P<operation_type>\w+)"\s*\})'
+)
+ACTION_RE = re.compile(_ACTION_ALTERNATIVES)
+# Subjects and actions are rewritten in one scan; exactly one named group matches
+SUBJECT_ACTION_RE = re.compile(
+    # Opening of a subject block; its end is found by brace depth, so nested objects are kept whole
+    r'(?P<subject>"subject":\s*\{)|' + _ACTION_ALTERNATIVES
+)
+BRACE_RE = re.compile(r'[{}]')
+
+# Below this many files, worker process startup costs more than it saves
+MIN_FILES_FOR_POOL = 4
+
 def log_info(msg: str):
-    print(f"{Colors.BLUE}[INFO]{Colors.NC} {msg}")
+    print(INFO_PREFIX + msg)
 
 def log_success(msg: str):
-    print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} {msg}")
+    print(SUCCESS_PREFIX + msg)
 
 def log_warning(msg: str):
-    print(f"{Colors.YELLOW}[WARNING]{Colors.NC} {msg}")
+    print(WARNING_PREFIX + msg)
 
 def log_error(msg: str):
-    print(f"{Colors.RED}[ERROR]{Colors.NC} {msg}")
+    print(ERROR_PREFIX + msg)
 
 def add_mock_data_injections(content: str) -> Tuple[str, int]:
     """
     Add mock data injections for federation and trusted issuers.
     Returns: (modified content, number of changes made)
     """
-    changes = 0
-
-    # Pattern: authorization.decision or authz.allow with input but no mocks
-    pattern = r'((?:authorization\.decision|authz\.allow|authz\.decision|coi_validation\.allow|guardrails\.guardrails_pass)\s+with input as \{[^}]+\})((?:\s+with data\.[^\n]+)*)\s*(\n\s*(?:result|decision))'
-
-    def add_mocks(match):
-        nonlocal changes
-        test_call = match.group(1)
-        existing_mocks = match.group(2) if match.group(2) else ""
-        rest = match.group(3)
-
-        # Check if mocks already exist
-        if "data.dive.tenant.base.trusted_issuers" in existing_mocks:
-            return match.group(0)  # Already has mocks
-
-        changes += 1
-
-        # Add mock injections
-        new_mocks = existing_mocks
-        new_mocks += "\n    with data.dive.tenant.base.trusted_issuers as {}"
-        new_mocks += "\n    with data.dive.tenant.federation_constraints.federation_matrix as {}"
-
-        return test_call + new_mocks + rest
-
-    modified = re.sub(pattern, add_mocks, content, flags=re.DOTALL)
-    return modified, changes
-
-def add_missing_subject_fields(content: str) -> Tuple[str, int]:
-    """
-    Add mfaVerified and aal fields to subjects that are missing them.
-    Returns: (modified content, number of changes made)
-    """
-    changes = 0
-
-    def fix_subject(match):
-        nonlocal changes
-        subject_block = match.group(0)
-
-        # Skip if already has mfaVerified
-        if 'mfaVerified' in subject_block or "'mfaVerified'" in subject_block:
-            return subject_block
-
-        # Skip if subject is incomplete (edge case tests)
-        if 'authenticated' not in subject_block:
-            return subject_block
-
-        changes += 1
-
-        # Determine MFA value based on clearance
-        is_unclassified = 'UNCLASSIFIED' in subject_block
-        mfa_value = 'false' if is_unclassified else 'true'
-        aal_value = '1' if is_unclassified else '2'
-
-        # Add before authenticated field
-        if '"authenticated":' in subject_block:
-            subject_block = subject_block.replace(
-                '"authenticated":',
-                f'"mfaVerified": {mfa_value},\n            "aal": {aal_value},\n            "authenticated":'
-            )
-        elif "'authenticated':" in subject_block:
-            subject_block = subject_block.replace(
-                "'authenticated':",
-                f"'mfaVerified': {mfa_value},\n            'aal': {aal_value},\n            'authenticated':"
-            )
-
-        return subject_block
-
-    # Match subject blocks
-    pattern = r'"subject":\s*\{[^}]+\}'
-    modified = re.sub(pattern, fix_subject, content)
-
-    return modified, changes
-
-def fix_action_format(content: str) -> Tuple[str, int]:
-    """
-    Convert action strings to object format: "read" -> {"type": "read"}
-    Returns: (modified content, number of changes made)
-    """
-    changes = 0
-
-    def fix_action(match):
-        nonlocal changes
-        changes += 1
-        action_type = match.group(1)
-        return f'"action": {{"type": "{action_type}"}}'
-
-    # Match: "action": "read" or "action": "write"
-    pattern = r'"action":\s*"(\w+)"'
-    modified = re.sub(pattern, fix_action, content)
-
-    return modified, changes
+    if not any(call in content for call in MOCKED_CALLS):
+        return content, 0
+
+    return MOCK_INJECTION_RE.subn(ADD_MOCK_DATA, content)
+
+def add_mfa_fields(subject_block: str) -> str:
+    """Add mfaVerified and aal fields before the authenticated field of a subject block."""
+    # Determine MFA value based on clearance
+    is_unclassified = 'UNCLASSIFIED' in subject_block
+    mfa_value = 'false' if is_unclassified else 'true'
+    aal_value = '1' if is_unclassified else '2'
+
+    # Add before authenticated field
+    if '"authenticated":' in subject_block:
+        subject_block = subject_block.replace(
+            '"authenticated":',
+            f'"mfaVerified": {mfa_value},\n            "aal": {aal_value},\n            "authenticated":'
+        )
+    elif "'authenticated':" in subject_block:
+        subject_block = subject_block.replace(
+            "'authenticated':",
+            f"'mfaVerified': {mfa_value},\n            'aal': {aal_value},\n            'authenticated':"
+        )
 
-def fix_operation_to_type(content: str) -> Tuple[str, int]:
+    return subject_block
+
+def match_braces(content: str) -> Dict[int, int]:
+    """Map the index of every closed '{' to the index just past its matching '}', in one pass."""
+    block_ends = {}
+    open_positions = []
+    for brace in BRACE_RE.finditer(content):
+        if brace.group() == '{':
+            open_positions.append(brace.start())
+        elif open_positions:
+            block_ends[open_positions.pop()] = brace.end()
+    return block_ends
+
+def find_all(content: str, word: str) -> List[int]:
+    """Return the sorted start indexes of every occurrence of word."""
+    positions = []
+    pos = content.find(word)
+    while pos >= 0:
+        positions.append(pos)
+        pos = content.find(word, pos + 1)
+    return positions
+
+def occurs_within(positions: List[int], word: str, start: int, end: int) -> bool:
+    """Whether an occurrence from find_all lies entirely inside content[start:end]."""
+    i = bisect_left(positions, start)
+    return i < len(positions) and positions[i] + len(word) <= end
+
+def fix_subjects_and_actions(content: str) -> Tuple[str, int, int, int]:
     """
-    Convert action.operation to action.type for consistency.
-    Returns: (modified content, number of changes made)
+    Add missing mfaVerified/aal subject fields, convert action strings to
+    {"type": ...} objects and action.operation to action.type, in a single scan.
+    Returns: (modified content, subject changes, action changes, operation changes)
     """
-    changes = 0
+    if '"subject"' not in content and '"action"' not in content:
+        return content, 0, 0, 0
+
+    counts = {"subject": 0, "action": 0, "operation": 0}
+
+    def convert_action(match):
+        counts[match.lastgroup] += 1
+        return f'"action": {{"type": "{match.group(match.lastgroup + "_type")}"}}'
+
+    # Brace pairs and field names are indexed once, so each subject is checked in O(log n)
+    block_ends = match_braces(content) if '"subject"' in content else {}
+    mfa_positions = find_all(content, 'mfaVerified')
+    authenticated_positions = find_all(content, 'authenticated')
+
+    parts = []
+    pos = 0
+    search_pos = 0
+
+    while True:
+        match = SUBJECT_ACTION_RE.search(content, search_pos)
+        if match is None:
+            break
+
+        if match.lastgroup == "subject":
+            start = match.start()
+            end = block_ends.get(match.end() - 1, -1)
+            # Skip unterminated blocks, subjects that already have mfaVerified,
+            # and incomplete subjects (edge case tests); keep scanning inside them
+            if (end < 0
+                    or occurs_within(mfa_positions, 'mfaVerified', start, end)
+                    or not occurs_within(authenticated_positions, 'authenticated', start, end)):
+                search_pos = match.end()
+                continue
+            counts["subject"] += 1
+            # Actions inside the rewritten block are converted too
+            replacement = ACTION_RE.sub(convert_action, add_mfa_fields(content[start:end]))
+        else:
+            end = match.end()
+            replacement = convert_action(match)
 
-    def fix_operation(match):
-        nonlocal changes
-        changes += 1
-        operation_value = match.group(1)
-        return f'"action": {{"type": "{operation_value}"}}'
+        parts.append(content[pos:match.start()])
+        parts.append(replacement)
+        pos = search_pos = end
 
-    # Match: "action": {"operation": "read"}
-    pattern = r'"action":\s*\{\s*"operation":\s*"(\w+)"\s*\}'
-    modified = re.sub(pattern, fix_operation, content)
+    if pos == 0:
+        return content, 0, 0, 0
 
-    return modified, changes
+    parts.append(content[pos:])
+    return "".join(parts), counts["subject"], counts["action"], counts["operation"]
 
 def migrate_test_file(file_path: Path) -> bool:
     """
@@ -156,49 +215,71 @@ def migrate_test_file(file_path: Path) -> bool:
     log_info(f"Migrating: {file_path.name}")
 
     try:
-        # Read original content
-        content = file_path.read_text()
-
-        # Create backup
-        backup_path = file_path.with_suffix('.rego.backup')
-        backup_path.write_text(content)
-
-        # Apply migrations
-        modified, mock_changes = add_mock_data_injections(content)
-        modified, subject_changes = add_missing_subject_fields(modified)
-        modified, action_changes = fix_action_format(modified)
-        modified, operation_changes = fix_operation_to_type(modified)
-
-        total_changes = mock_changes + subject_changes + action_changes + operation_changes
-
-        if total_changes == 0:
+        # Empty files have nothing to migrate; skip the read
+        if file_path.stat().st_size == 0:
             log_info(f"  No changes needed")
-            backup_path.unlink()  # Remove unnecessary backup
             return True
+        content = file_path.read_text()
+    except (OSError, UnicodeDecodeError) as e:
+        log_error(f"  Failed: {str(e)}")
+        return False
 
-        # Write modified content
-        file_path.write_text(modified)
+    # Apply migrations
+    modified, mock_changes = add_mock_data_injections(content)
+    modified, subject_changes, action_changes, operation_changes = fix_subjects_and_actions(modified)
 
-        log_success(f"  ✓ {total_changes} changes:")
-        if mock_changes > 0:
-            print(f"    - Added mock data to {mock_changes} tests")
-        if subject_changes > 0:
-            print(f"    - Fixed {subject_changes} subject blocks")
-        if action_changes > 0:
-            print(f"    - Fixed {action_changes} action strings")
-        if operation_changes > 0:
-            print(f"    - Fixed {operation_changes} operation fields")
+    total_changes = mock_changes + subject_changes + action_changes + operation_changes
 
+    if total_changes == 0:
+        log_info(f"  No changes needed")
         return True
 
-    except Exception as e:
+    # Back up the original, then swap in the modified content atomically
+    tmp_path = file_path.with_suffix('.rego.tmp')
+    try:
+        file_path.with_suffix('.rego.backup').write_text(content)
+        tmp_path.write_text(modified)
+        os.replace(tmp_path, file_path)
+    except OSError as e:
         log_error(f"  Failed: {str(e)}")
-        # Restore from backup if it exists
-        backup_path = file_path.with_suffix('.rego.backup')
-        if backup_path.exists():
-            backup_path.rename(file_path)
+        # The original is only replaced once fully written; drop any partial temp file
+        tmp_path.unlink(missing_ok=True)
         return False
 
+    log_success(f"  ✓ {total_changes} changes:")
+    if mock_changes > 0:
+        print(f"    - Added mock data to {mock_changes} tests")
+    if subject_changes > 0:
+        print(f"    - Fixed {subject_changes} subject blocks")
+    if action_changes > 0:
+        print(f"    - Fixed {action_changes} action strings")
+    if operation_changes > 0:
+        print(f"    - Fixed {operation_changes} operation fields")
+
+    return True
+
+def migrate_and_capture(file_path: Path) -> Tuple[bool, str]:
+    """Migrate a test file in a worker process, returning its result and printed output."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        migrated = migrate_test_file(file_path)
+    return migrated, output.getvalue()
+
+def migrate_test_files(test_files: List[Path]) -> List[bool]:
+    """
+    Migrate test files, across worker processes when there are enough of them.
+    Per-file output is printed in file order either way.
+    """
+    if len(test_files) < MIN_FILES_FOR_POOL:
+        return [migrate_test_file(test_file) for test_file in test_files]
+
+    results = []
+    with ProcessPoolExecutor() as executor:
+        for migrated, output in executor.map(migrate_and_capture, test_files):
+            print(output, end="")
+            results.append(migrated)
+    return results
+
 def main():
     """Main execution"""
     log_info("Starting OPA Test Migration...")
@@ -212,25 +293,15 @@ def main():
         log_error(f"Policies directory not found: {policies_dir}")
         sys.exit(1)
 
-    # Find all test files
-    test_files = list(policies_dir.glob("*_test.rego"))
-
-    # Also check subdirectories
-    for subdir in policies_dir.rglob("*"):
-        if subdir.is_dir():
-            test_files.extend(subdir.glob("*_test.rego"))
+    # Find all test files, including subdirectories
+    test_files = list(policies_dir.rglob("*_test.rego"))
 
     log_info(f"Found {len(test_files)} test files")
 
     # Migrate each file
-    success_count = 0
-    failed_count = 0
-
-    for test_file in test_files:
-        if migrate_test_file(test_file):
-            success_count += 1
-        else:
-            failed_count += 1
+    results = migrate_test_files(test_files)
+    success_count = sum(results)
+    failed_count = len(results) - success_count
 
     # Print summary
     print("\n" + "="*60)
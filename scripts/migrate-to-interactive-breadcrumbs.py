@@ -12,7 +12,7 @@ from pathlib import Path
 FRONTEND_DIR = Path(__file__).parent.parent / "frontend" / "src" / "app" / "admin"
 
 # Files to migrate
-FILES_TO_MIGRATE = [
+FILES_TO_MIGRATE = (
     "approvals/page.tsx",
     "certificates/page.tsx",
     "clearance-management/page.tsx",
@@ -40,7 +40,12 @@ FILES_TO_MIGRATE = [
     "tools/decision-replay/page.tsx",
     "tools/policy-simulation/page.tsx",
     "users/provision/page.tsx",
-]
+)
+
+# (absolute path, path relative to FRONTEND_DIR) for each file to migrate
+TARGETS = tuple((FRONTEND_DIR / rel, rel) for rel in FILES_TO_MIGRATE)
+# FRONTEND_DIR relative to the frontend root, for "not found" messages
+FRONTEND_DIR_LABEL = FRONTEND_DIR.relative_to(FRONTEND_DIR.parent.parent.parent).as_posix()
 
 IMPORT_LINE = "import { InteractiveBreadcrumbs } from '@/components/ui/interactive-breadcrumbs';"
 BREADCRUMBS_JSX = """      {/* Interactive Breadcrumbs - SSOT */}
@@ -49,52 +54,64 @@ BREADCRUMBS_JSX = """      {/* Interactive Breadcrumbs - SSOT */}
       </div>
 """
 
+# Import statements, one per line
+IMPORT_RE = re.compile(r'^import .*?;$', re.MULTILINE)
+# breadcrumbs={[...]} prop on PageLayout, across multiple lines
+BREADCRUMBS_PROP_RE = re.compile(r'\s*breadcrumbs=\{\s*\[[\s\S]*?\]\s*\}\s*\n')
+# <PageLayout ...> opening tag at the end of a line
+PAGELAYOUT_OPEN_RE = re.compile(r'(<PageLayout[^>]*>)\s*\n')
+
 
-def migrate_file(filepath: Path) -> bool:
+def migrate_file(filepath: Path, rel: str) -> bool:
     """Migrate a single file to use InteractiveBreadcrumbs"""
 
-    if not filepath.exists():
-        print(f"⊘ Skipping {filepath.relative_to(FRONTEND_DIR.parent.parent.parent)} (not found)")
+    try:
+        size = filepath.stat().st_size
+    except FileNotFoundError:
+        print(f"⊘ Skipping {FRONTEND_DIR_LABEL}/{rel} (not found)")
         return False
 
-    content = filepath.read_text()
-    original_content = content
+    if size == 0:
+        print(f"⊘ Skipping {rel} (empty)")
+        return False
 
-    # Check if already migrated
-    if "InteractiveBreadcrumbs" in content:
-        print(f"✓ Already migrated: {filepath.relative_to(FRONTEND_DIR)}")
+    raw = filepath.read_bytes()
+
+    # Check if already migrated (before paying for the decode)
+    if b"InteractiveBreadcrumbs" in raw:
+        print(f"✓ Already migrated: {rel}")
         return False
 
-    print(f"→ Processing: {filepath.relative_to(FRONTEND_DIR)}")
+    content = raw.decode("utf-8")
+    original_content = content
+
+    print(f"→ Processing: {rel}")
 
     # Step 1: Add import after last import statement
     if IMPORT_LINE not in content:
         # Find the last import line
-        import_matches = list(re.finditer(r'^import .*?;$', content, re.MULTILINE))
-        if import_matches:
-            last_import = import_matches[-1]
-            insert_pos = last_import.end()
+        insert_pos = None
+        for match in IMPORT_RE.finditer(content):
+            insert_pos = match.end()
+        if insert_pos is not None:
             content = content[:insert_pos] + "\n" + IMPORT_LINE + content[insert_pos:]
             print(f"  ✓ Added InteractiveBreadcrumbs import")
 
     # Step 2: Remove breadcrumbs prop from PageLayout
-    # Match: breadcrumbs={[...]} across multiple lines
-    breadcrumbs_pattern = r'\s*breadcrumbs=\{\s*\[[\s\S]*?\]\s*\}\s*\n'
-    if re.search(breadcrumbs_pattern, content):
-        content = re.sub(breadcrumbs_pattern, '\n', content)
-        print(f"  ✓ Removed breadcrumbs prop")
+    if b"breadcrumbs=" in raw:
+        content, removed = BREADCRUMBS_PROP_RE.subn('\n', content)
+        if removed:
+            print(f"  ✓ Removed breadcrumbs prop")
 
     # Step 3: Add InteractiveBreadcrumbs after PageLayout opening tag
     # Find <PageLayout...> and add breadcrumbs after the closing >
-    pagelayout_pattern = r'(<PageLayout[^>]*>)\s*\n'
-
     def add_breadcrumbs(match):
         return match.group(1) + "\n" + BREADCRUMBS_JSX
 
-    if re.search(pagelayout_pattern, content):
-        # Only add if not already present
-        if '<InteractiveBreadcrumbs />' not in content:
-            content = re.sub(pagelayout_pattern, add_breadcrumbs, content, count=1)
+    # Only add if not already present
+    if b"<PageLayout" in raw and '<InteractiveBreadcrumbs />' not in content:
+        content, added = PAGELAYOUT_OPEN_RE.subn(add_breadcrumbs, content, count=1)
+        if added:
             print(f"  ✓ Added InteractiveBreadcrumbs component")
 
     # Write back if changed
@@ -115,9 +132,8 @@ def main():
     migrated_count = 0
     skipped_count = 0
 
-    for file_path in FILES_TO_MIGRATE:
-        full_path = FRONTEND_DIR / file_path
-        if migrate_file(full_path):
+    for full_path, rel in TARGETS:
+        if migrate_file(full_path, rel):
             migrated_count += 1
         else:
             skipped_count += 1
@@ -5,36 +5,40 @@ Remove InteractiveBreadcrumbs from admin page children
 """
 
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 
 FRONTEND_DIR = Path("frontend/src/app/admin")
 
-def remove_breadcrumbs_from_children(filepath: Path) -> bool:
+# All variations of InteractiveBreadcrumbs rendering, removed in one scan.
+# Longer variants come first so a comment or div wrapper goes with its component.
+BREADCRUMBS_RE = re.compile(
+    # Pattern 1: With div wrapper and comment
+    r'\s*\{/\*[^\*]*Interactive Breadcrumbs[^\*]*\*/\}\s*\n\s*<div className="mb-6">\s*\n\s*<InteractiveBreadcrumbs />\s*\n\s*</div>\s*\n'
+    # Pattern 2: With div wrapper, no comment
+    r'|\s*<div className="mb-6">\s*\n\s*<InteractiveBreadcrumbs />\s*\n\s*</div>\s*\n'
+    # Pattern 3: With comment only
+    r'|\s*\{/\*[^\*]*Interactive Breadcrumbs[^\*]*\*/\}\s*\n\s*<InteractiveBreadcrumbs />\s*\n'
+    # Pattern 4: Just the component
+    r'|\s*<InteractiveBreadcrumbs />\s*\n'
+)
+
+def remove_breadcrumbs_from_children(filepath: Path, content: Optional[str] = None) -> bool:
     """Remove InteractiveBreadcrumbs component calls from page content"""
 
-    if not filepath.exists():
+    if content is None:
+        if not filepath.exists():
+            return False
+        content = filepath.read_text()
+
+    # Every variant renders the component; pages that only import it need no regex pass
+    if "<InteractiveBreadcrumbs" not in content:
         return False
 
-    content = filepath.read_text()
     original_content = content
 
-    # Remove all variations of InteractiveBreadcrumbs rendering
-    patterns = [
-        # Pattern 1: With div wrapper and comment
-        r'\s*\{/\*[^\*]*Interactive Breadcrumbs[^\*]*\*/\}\s*\n\s*<div className="mb-6">\s*\n\s*<InteractiveBreadcrumbs />\s*\n\s*</div>\s*\n',
-
-        # Pattern 2: With div wrapper, no comment
-        r'\s*<div className="mb-6">\s*\n\s*<InteractiveBreadcrumbs />\s*\n\s*</div>\s*\n',
-
-        # Pattern 3: Just the component
-        r'\s*<InteractiveBreadcrumbs />\s*\n',
-
-        # Pattern 4: With comment only
-        r'\s*\{/\*[^\*]*Interactive Breadcrumbs[^\*]*\*/\}\s*\n\s*<InteractiveBreadcrumbs />\s*\n',
-    ]
-
-    for pattern in patterns:
-        content = re.sub(pattern, '\n', content)
+    content = BREADCRUMBS_RE.sub('\n', content)
 
     if content != original_content:
         filepath.write_text(content)
@@ -42,6 +46,15 @@ def remove_breadcrumbs_from_children(filepath: Path) -> bool:
     return False
 
 
+def process_page(page: Path) -> bool:
+    """Read an admin page once and clean it if it mentions InteractiveBreadcrumbs"""
+    # Only decode pages that mention the component
+    raw = page.read_bytes()
+    if b"InteractiveBreadcrumbs" not in raw:
+        return False
+    return remove_breadcrumbs_from_children(page, raw.decode("utf-8"))
+
+
 def main():
     print("🔄 Removing InteractiveBreadcrumbs from Page Children")
     print("=" * 60)
@@ -49,12 +62,13 @@ def main():
     print()
 
     # Find all page.tsx files
-    admin_pages = list(FRONTEND_DIR.rglob("page.tsx"))
+    admin_pages = FRONTEND_DIR.rglob("page.tsx")
 
     fixed = 0
-    for page in admin_pages:
-        if "InteractiveBreadcrumbs" in page.read_text():
-            if remove_breadcrumbs_from_children(page):
+    with ThreadPoolExecutor() as executor:
+        # The page generator is consumed once, so each result carries its page
+        for page, was_cleaned in executor.map(lambda page: (page, process_page(page)), admin_pages):
+            if was_cleaned:
                 rel_path = page.relative_to(FRONTEND_DIR.parent.parent.parent)
                 print(f"✓ Cleaned: {rel_path}")
                 fixed += 1
@@ -11,6 +11,8 @@ FILES = [
     "frontend/src/app/admin/monitoring/resources/page.tsx",
 ]
 
+BREADCRUMBS_PROP_RE = re.compile(r'\s*breadcrumbs=\{\s*\[[\s\S]*?\]\s*\}\s*\n')
+
 for filepath in FILES:
     p = Path(filepath)
     if not p.exists():
@@ -20,8 +22,7 @@ for filepath in FILES:
     content = p.read_text()
 
     # Remove breadcrumbs prop (multi-line)
-    pattern = r'\s*breadcrumbs=\{\s*\[[\s\S]*?\]\s*\}\s*\n'
-    new_content = re.sub(pattern, '\n', content)
+    new_content = BREADCRUMBS_PROP_RE.sub('\n', content)
 
     if content != new_content:
         p.write_text(new_content)